@@ -0,0 +1,21 @@
+﻿"""
+Budget
+Deadline contract shared by generators and the budget scheduler
+"""
+import time
+from typing import Optional
+
+
+class BudgetExceeded(Exception):
+    """Raised by a generator that hits its deadline before finishing"""
+
+
+def check_deadline(deadline: Optional[float]):
+    """
+    Raise BudgetExceeded if a time.monotonic() deadline has passed
+
+    Generators call this between model calls so an over-budget case stops
+    promptly instead of running on after the scheduler has given up on it.
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        raise BudgetExceeded("wall-clock budget exhausted")
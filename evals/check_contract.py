@@ -0,0 +1,97 @@
+﻿"""
+Contract Check Sanity Test
+Checks the schema compiler against known-good and known-bad payloads,
+and times bulk validation
+
+Usage: python -m evals.check_contract
+"""
+import sys
+import time
+
+import yaml
+
+from evals.config import GOLDEN_SET_DIR
+from evals.contract_check import ContractChecker, SchemaCompiler, get_response_schema
+
+GOLDEN_SPEC = GOLDEN_SET_DIR / 'jsonplaceholder' / 'get_posts.yaml'
+
+# Bulk validation target: thousands of payloads in milliseconds
+BULK_PAYLOADS = 5000
+BULK_MAX_SECONDS = 0.1
+
+
+def make_post(post_id: int) -> dict:
+    return {
+        'userId': (post_id - 1) // 10 + 1,
+        'id': post_id,
+        'title': f'post {post_id}',
+        'body': f'body of post {post_id}',
+    }
+
+
+def main() -> int:
+    with open(GOLDEN_SPEC, 'r', encoding='utf-8') as f:
+        expected_spec = yaml.safe_load(f)['expected_spec']
+
+    schema = get_response_schema(expected_spec, '/posts', 'get', '200')
+    validator = SchemaCompiler().compile(schema, expected_spec)
+
+    good = [make_post(i) for i in range(1, 101)]
+    cases = [
+        ('100 posts', good, True),
+        ('empty list', [], True),
+        ('missing userId', [{k: v for k, v in good[0].items() if k != 'userId'}], False),
+        ('string id', [dict(good[0], id='1')], False),
+        ('boolean id', [dict(good[0], id=True)], False),
+        ('object instead of array', good[0], False),
+    ]
+
+    failures = 0
+    for name, payload, expected in cases:
+        ok = validator(payload) == expected
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {name}: expected {'valid' if expected else 'invalid'}")
+
+    # Recursive $ref: nested children are checked too
+    tree_spec = {'components': {'schemas': {'Node': {
+        'type': 'object',
+        'properties': {
+            'v': {'type': 'integer'},
+            'child': {'$ref': '#/components/schemas/Node'},
+        },
+    }}}}
+    tree = SchemaCompiler().compile({'$ref': '#/components/schemas/Node'}, tree_spec)
+    for name, payload, expected in [
+        ('nested tree', {'v': 1, 'child': {'v': 2, 'child': {'v': 3}}}, True),
+        ('bad nested child', {'v': 1, 'child': {'v': 'x'}}, False),
+    ]:
+        ok = tree(payload) == expected
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {name}: expected {'valid' if expected else 'invalid'}")
+
+    # Unusable generated schema: samples fail, the check doesn't crash
+    bad_spec = {'paths': {'/posts': {'get': {'responses': {'200': {
+        'content': {'application/json': {'schema': {'type': 'string', 'pattern': r'^\p{L}'}}}
+    }}}}}}
+    result = ContractChecker().check(bad_spec, {'/posts': {'get': {'200': ['a']}}})
+    ok = result['passed'] == 0 and 'error' in result['operations']['GET /posts 200']
+    failures += not ok
+    print(f"{'✓' if ok else '✗'} unsupported pattern: recorded as failure")
+
+    # Bulk: one post per payload, as a paginated/single-item endpoint would return
+    samples = {'/posts': {'get': {'200': [[make_post(i % 100 + 1)] for i in range(BULK_PAYLOADS)]}}}
+    checker = ContractChecker()
+    start = time.perf_counter()
+    result = checker.check(expected_spec, samples)
+    seconds = time.perf_counter() - start
+
+    bulk_ok = result['passed'] == BULK_PAYLOADS and seconds <= BULK_MAX_SECONDS
+    failures += not bulk_ok
+    print(f"{'✓' if bulk_ok else '✗'} {BULK_PAYLOADS} payloads validated in "
+          f"{seconds*1000:.1f}ms (limit {BULK_MAX_SECONDS*1000:.0f}ms)")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
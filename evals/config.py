@@ -9,6 +9,8 @@ PROJECT_ROOT = Path(__file__).parent.parent
 GOLDEN_SET_DIR = PROJECT_ROOT / 'data' / 'golden_set'
 GENERATED_DIR = PROJECT_ROOT / 'data' / 'generated'
 EVAL_RESULTS_DIR = PROJECT_ROOT / 'data' / 'eval_results'
+SAMPLES_DIR = PROJECT_ROOT / 'data' / 'samples'  # Recorded responses: <endpoint_id>.json
+DOC_CACHE_DIR = PROJECT_ROOT / 'data' / 'doc_cache'  # Chunked/deduped documentation
 
 # Create directories if they don't exist
 GENERATED_DIR.mkdir(parents=True, exist_ok=True)
@@ -20,6 +22,7 @@ TARGET_METRICS = {
     'field_accuracy': 0.90,         # 90% of fields correct
     'hallucination_rate': 0.05,     # <5% hallucinated content
     'schema_validity': 1.0,         # 100% valid OpenAPI specs
+    'contract_validity': 1.0,       # Generated schemas accept all recorded samples
 }
 
 # APIs to evaluate (in priority order)
@@ -28,3 +31,8 @@ EVAL_APIS = [
     'openweather',      # Add next (API key auth)
     'github',           # Add last (complex)
 ]
+
+# Nightly run budget (see evals/scheduler.py)
+NIGHTLY_MAX_SECONDS = 60 * 60       # Wall-clock window for a full run
+NIGHTLY_MAX_TOKENS = 2_000_000      # Generation tokens across all APIs
+MAX_CONCURRENT_GENERATIONS = 4
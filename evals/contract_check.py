@@ -0,0 +1,472 @@
+﻿"""
+Contract Check
+Validates recorded sample responses against generated response schemas
+
+Sample files live in SAMPLES_DIR as <endpoint_id>.json:
+    {"/posts": {"get": {"200": [<payload>, <payload>, ...]}}}
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+Validator = Callable[[Any], bool]
+
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
+
+def _accept_all(value: Any) -> bool:
+    return True
+
+
+def _canonical(value: Any) -> str:
+    """JSON form used for type-aware equality (enum, uniqueItems)"""
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _is_integer(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    return isinstance(value, float) and value.is_integer()
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class SchemaError(ValueError):
+    """A generated schema the compiler cannot turn into a validator"""
+
+
+def _bound(schema: Dict[str, Any], keyword: str) -> Any:
+    """Numeric keyword value (minLength, maximum, ...), checked at compile time"""
+    value = schema[keyword]
+    if not _is_number(value):
+        raise SchemaError(f"{keyword} must be a number, got {value!r}")
+    return value
+
+
+TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'integer': _is_integer,
+    'number': _is_number,
+    'boolean': lambda v: isinstance(v, bool),
+}
+
+
+class SchemaCompiler:
+    """
+    Compile OpenAPI 3.x schemas into plain Python validator functions
+
+    Each schema is turned into a tree of closures once, then reused for
+    every payload. Compiled validators are cached by a hash of the schema
+    (plus the spec's components when it uses $ref), so identical schemas
+    across endpoints and runs share one validator.
+
+    $refs are compiled lazily, once per ref, so recursive schemas are
+    validated all the way down. Schemas the compiler can't handle raise
+    SchemaError.
+    """
+
+    def __init__(self):
+        self._cache: Dict[str, Validator] = {}
+
+    def compile(
+        self,
+        schema: Dict[str, Any],
+        spec: Optional[Dict[str, Any]] = None
+    ) -> Validator:
+        """
+        Get a validator for a schema, compiling it on first use
+
+        Args:
+            schema: OpenAPI schema object
+            spec: Full spec the schema came from (used to resolve $ref)
+
+        Returns:
+            Function taking a payload and returning True if it conforms
+        """
+        spec = spec or {}
+        key = self.schema_hash(schema)
+        if '$ref' in _canonical(schema):
+            key += self.schema_hash(spec.get('components', {}))
+        validator = self._cache.get(key)
+        if validator is None:
+            validator = self._build(schema, {'spec': spec, 'refs': {}})
+            self._cache[key] = validator
+        return validator
+
+    @staticmethod
+    def schema_hash(schema: Dict[str, Any]) -> str:
+        """Stable hash of a schema (key order does not matter)"""
+        canonical = json.dumps(schema, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def cache_size(self) -> int:
+        return len(self._cache)
+
+    def _build_ref(self, ref: Any, ctx: Dict[str, Any]) -> Validator:
+        """Compile a local $ref once; a ref still being compiled is looked up at call time"""
+        if not isinstance(ref, str) or not ref.startswith('#/'):
+            raise SchemaError(f"unsupported $ref {ref!r}")
+
+        refs = ctx['refs']
+        if ref in refs:
+            built = refs[ref]
+            if built is not None:
+                return built
+            # Recursive reference: resolve when validating, not now
+            return lambda v: refs[ref](v)
+
+        target: Any = ctx['spec']
+        for part in ref[2:].split('/'):
+            part = part.replace('~1', '/').replace('~0', '~')
+            if not isinstance(target, dict) or part not in target:
+                raise SchemaError(f"unresolvable $ref {ref!r}")
+            target = target[part]
+
+        refs[ref] = None
+        refs[ref] = self._build(target, ctx)
+        return refs[ref]
+
+    def _build_type(self, schema_type: Any) -> Validator:
+        if schema_type == 'null':
+            return lambda v: v is None
+        if isinstance(schema_type, str) and schema_type in TYPE_CHECKS:
+            return TYPE_CHECKS[schema_type]
+        raise SchemaError(f"unknown type {schema_type!r}")
+
+    def _build(self, schema: Dict[str, Any], ctx: Dict[str, Any]) -> Validator:
+        """Build the closure tree for a schema"""
+        if isinstance(schema, bool):
+            return _accept_all if schema else (lambda v: False)
+        if not isinstance(schema, dict):
+            raise SchemaError(f"schema must be an object, got {schema!r}")
+        if '$ref' in schema:
+            return self._build_ref(schema['$ref'], ctx)
+        if not schema:
+            return _accept_all
+
+        checks: List[Validator] = []
+
+        schema_type = schema.get('type')
+        if isinstance(schema_type, list):
+            # OpenAPI 3.1 style: type: [string, 'null']
+            type_checks = tuple(self._build_type(t) for t in schema_type)
+            checks.append(lambda v: any(check(v) for check in type_checks))
+        elif schema_type is not None:
+            checks.append(self._build_type(schema_type))
+
+        if 'enum' in schema:
+            if not isinstance(schema['enum'], list):
+                raise SchemaError("enum must be a list")
+            # Compare canonical JSON so True doesn't match 1 (and vice versa)
+            allowed = frozenset(_canonical(item) for item in schema['enum'])
+            checks.append(lambda v: _canonical(v) in allowed)
+
+        checks.extend(self._build_object_checks(schema, ctx))
+        checks.extend(self._build_array_checks(schema, ctx))
+        checks.extend(self._build_scalar_checks(schema))
+
+        for sub in schema.get('allOf', []):
+            checks.append(self._build(sub, ctx))
+
+        if schema.get('anyOf'):
+            options = [self._build(sub, ctx) for sub in schema['anyOf']]
+            checks.append(lambda v: any(option(v) for option in options))
+
+        if schema.get('oneOf'):
+            options = [self._build(sub, ctx) for sub in schema['oneOf']]
+            checks.append(lambda v: sum(1 for option in options if option(v)) == 1)
+
+        if 'not' in schema:
+            negated = self._build(schema['not'], ctx)
+            checks.append(lambda v: not negated(v))
+
+        if not checks:
+            validator = _accept_all
+        elif len(checks) == 1:
+            validator = checks[0]
+        else:
+            def validator(value: Any, _checks=tuple(checks)) -> bool:
+                for check in _checks:
+                    if not check(value):
+                        return False
+                return True
+
+        if schema.get('nullable'):
+            inner = validator
+            return lambda v: v is None or inner(v)
+        return validator
+
+    def _build_object_checks(
+        self,
+        schema: Dict[str, Any],
+        ctx: Dict[str, Any]
+    ) -> List[Validator]:
+        checks: List[Validator] = []
+        properties = schema.get('properties', {})
+        required = tuple(schema.get('required', []))
+        additional = schema.get('additionalProperties', True)
+        if not isinstance(properties, dict):
+            raise SchemaError("properties must be an object")
+
+        if required:
+            checks.append(
+                lambda v: not isinstance(v, dict) or all(name in v for name in required)
+            )
+
+        prop_validators = {
+            name: self._build(sub, ctx) for name, sub in properties.items()
+        }
+        prop_validators = {
+            name: validator for name, validator in prop_validators.items()
+            if validator is not _accept_all
+        }
+        if prop_validators:
+            prop_items = tuple(prop_validators.items())
+
+            def check_properties(value: Any) -> bool:
+                if not isinstance(value, dict):
+                    return True
+                for name, validator in prop_items:
+                    if name in value and not validator(value[name]):
+                        return False
+                return True
+
+            checks.append(check_properties)
+
+        if additional is False:
+            known = frozenset(properties)
+            checks.append(lambda v: not isinstance(v, dict) or known.issuperset(v))
+        elif isinstance(additional, dict) and additional:
+            extra = self._build(additional, ctx)
+            known = frozenset(properties)
+            checks.append(
+                lambda v: not isinstance(v, dict) or all(
+                    extra(item) for name, item in v.items() if name not in known
+                )
+            )
+
+        if 'minProperties' in schema:
+            low = _bound(schema, 'minProperties')
+            checks.append(lambda v: not isinstance(v, dict) or len(v) >= low)
+        if 'maxProperties' in schema:
+            high = _bound(schema, 'maxProperties')
+            checks.append(lambda v: not isinstance(v, dict) or len(v) <= high)
+
+        return checks
+
+    def _build_array_checks(
+        self,
+        schema: Dict[str, Any],
+        ctx: Dict[str, Any]
+    ) -> List[Validator]:
+        checks: List[Validator] = []
+
+        if 'items' in schema:
+            item_validator = self._build(schema['items'], ctx)
+            if item_validator is not _accept_all:
+                checks.append(
+                    lambda v: not isinstance(v, list) or all(map(item_validator, v))
+                )
+        if 'minItems' in schema:
+            low = _bound(schema, 'minItems')
+            checks.append(lambda v: not isinstance(v, list) or len(v) >= low)
+        if 'maxItems' in schema:
+            high = _bound(schema, 'maxItems')
+            checks.append(lambda v: not isinstance(v, list) or len(v) <= high)
+        if schema.get('uniqueItems'):
+            checks.append(
+                lambda v: not isinstance(v, list) or len(
+                    {_canonical(item) for item in v}
+                ) == len(v)
+            )
+
+        return checks
+
+    def _build_scalar_checks(self, schema: Dict[str, Any]) -> List[Validator]:
+        checks: List[Validator] = []
+
+        if 'minLength' in schema:
+            low = _bound(schema, 'minLength')
+            checks.append(lambda v: not isinstance(v, str) or len(v) >= low)
+        if 'maxLength' in schema:
+            high = _bound(schema, 'maxLength')
+            checks.append(lambda v: not isinstance(v, str) or len(v) <= high)
+        if 'pattern' in schema:
+            if not isinstance(schema['pattern'], str):
+                raise SchemaError("pattern must be a string")
+            try:
+                regex = re.compile(schema['pattern'])
+            except re.error as e:
+                # ECMA-262 only syntax, e.g. \p{L}
+                raise SchemaError(f"unsupported pattern {schema['pattern']!r}: {e}")
+            checks.append(lambda v: not isinstance(v, str) or regex.search(v) is not None)
+
+        # exclusiveMinimum/Maximum: boolean modifier (3.0) or the bound itself (3.1)
+        exclusive_min = schema.get('exclusiveMinimum')
+        exclusive_max = schema.get('exclusiveMaximum')
+        if 'minimum' in schema:
+            low = _bound(schema, 'minimum')
+            if exclusive_min is True:
+                checks.append(lambda v: not _is_number(v) or v > low)
+            else:
+                checks.append(lambda v: not _is_number(v) or v >= low)
+        if 'maximum' in schema:
+            high = _bound(schema, 'maximum')
+            if exclusive_max is True:
+                checks.append(lambda v: not _is_number(v) or v < high)
+            else:
+                checks.append(lambda v: not _is_number(v) or v <= high)
+        if _is_number(exclusive_min):
+            checks.append(lambda v: not _is_number(v) or v > exclusive_min)
+        if _is_number(exclusive_max):
+            checks.append(lambda v: not _is_number(v) or v < exclusive_max)
+
+        return checks
+
+
+def validate_batch(validator: Validator, samples: List[Any]) -> int:
+    """Validate many payloads with one compiled validator; returns count passed"""
+    return sum(map(validator, samples))
+
+
+def _is_json_media_type(media_type: str) -> bool:
+    """application/json, application/json; charset=utf-8, application/problem+json, ..."""
+    base = media_type.split(';', 1)[0].strip().lower()
+    return base == 'application/json' or (base.startswith('application/') and base.endswith('+json'))
+
+
+def get_response_schema(
+    spec: Dict[str, Any],
+    path: str,
+    method: str,
+    status_code: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Find the JSON response schema for an operation, if any
+
+    The response is looked up by exact status code, then its range
+    (e.g. 2XX), then 'default'. Any JSON media type matches, preferring
+    plain application/json.
+    """
+    operation = spec.get('paths', {}).get(path, {}).get(method.lower())
+    if not isinstance(operation, dict):
+        return None
+    responses = operation.get('responses', {})
+    if not isinstance(responses, dict):
+        return None
+
+    status_code = str(status_code)
+    response = None
+    for candidate in (status_code, f"{status_code[:1]}XX", f"{status_code[:1]}xx", 'default'):
+        if isinstance(responses.get(candidate), dict):
+            response = responses[candidate]
+            break
+    if response is None:
+        return None
+
+    content = response.get('content', {})
+    if not isinstance(content, dict):
+        return None
+    media_types = sorted(
+        (media_type for media_type in content if _is_json_media_type(media_type)),
+        key=lambda media_type: media_type != 'application/json'
+    )
+    for media_type in media_types:
+        media = content[media_type]
+        if isinstance(media, dict) and 'schema' in media:
+            return media['schema']
+    return None
+
+
+def load_samples(samples_path: Path) -> Dict[str, Any]:
+    """Load recorded sample responses (empty dict if none recorded)"""
+    if not samples_path.exists():
+        return {}
+    with open(samples_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ContractChecker:
+    """Check recorded sample responses against a generated spec"""
+
+    def __init__(self, compiler: Optional[SchemaCompiler] = None):
+        self.compiler = compiler or SchemaCompiler()
+
+    def check(
+        self,
+        generated_spec: Dict[str, Any],
+        samples: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Validate every recorded sample against the matching generated schema
+
+        Samples count as failures when the generated spec does not describe
+        the operation (or has no JSON schema for it), or when its schema
+        can't be compiled or applied; the reason is recorded per operation.
+
+        Args:
+            generated_spec: The AI-generated OpenAPI spec
+            samples: {path: {method: {status_code: [payload, ...]}}}
+
+        Returns:
+            Dictionary with total/passed counts and per-operation breakdown
+            ({'total', 'passed'} plus 'error' when the schema was unusable)
+        """
+        total = 0
+        passed = 0
+        operations = {}
+
+        for path, methods in samples.items():
+            for method, statuses in methods.items():
+                if method.lower() not in HTTP_METHODS:
+                    continue
+                for status_code, payloads in statuses.items():
+                    if not payloads:
+                        continue
+                    key = f"{method.upper()} {path} {status_code}"
+                    operation = {'total': len(payloads), 'passed': 0}
+                    operations[key] = operation
+
+                    schema = get_response_schema(
+                        generated_spec, path, method, status_code
+                    )
+                    if schema is None:
+                        operation['error'] = 'no JSON response schema'
+                        ok = 0
+                    else:
+                        # Bad generated schemas score 0 rather than crash the run
+                        try:
+                            validator = self.compiler.compile(schema, generated_spec)
+                            ok = validate_batch(validator, payloads)
+                        except (ValueError, TypeError, RecursionError) as e:
+                            operation['error'] = f"{type(e).__name__}: {e}"
+                            ok = 0
+                    operation['passed'] = ok
+
+                    total += len(payloads)
+                    passed += ok
+
+        return {'total': total, 'passed': passed, 'operations': operations}
+
+    def contract_validity(
+        self,
+        generated_spec: Dict[str, Any],
+        samples: Dict[str, Any]
+    ) -> Optional[float]:
+        """
+        What fraction of recorded samples does the generated spec accept?
+
+        Returns: 0.0 to 1.0, or None if there are no samples to check
+        """
+        result = self.check(generated_spec, samples)
+        if result['total'] == 0:
+            return None
+        return result['passed'] / result['total']
@@ -2,7 +2,9 @@
 Evaluation Metrics
 Core metrics for measuring spec generation quality
 """
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from evals.contract_check import ContractChecker
 
 
 class EvalMetrics:
@@ -10,11 +12,13 @@ class EvalMetrics:
     
     def __init__(self):
         self.metrics = {}
+        self.contract_checker = ContractChecker()
     
     def calculate_all_metrics(
         self,
         generated_spec: Dict[str, Any],
-        expected_spec: Dict[str, Any]
+        expected_spec: Dict[str, Any],
+        samples: Optional[Dict[str, Any]] = None
     ) -> Dict[str, float]:
         """
         Calculate all metrics comparing generated vs expected spec
@@ -22,6 +26,7 @@ class EvalMetrics:
         Args:
             generated_spec: The AI-generated OpenAPI spec
             expected_spec: The hand-verified golden spec
+            samples: Optional recorded responses for the contract check
             
         Returns:
             Dictionary of metric names to scores (0.0 to 1.0)
@@ -49,6 +54,15 @@ class EvalMetrics:
         # 5. Overall Score: Weighted average
         metrics['overall_score'] = self._overall_score(metrics)
         
+        # 6. Contract Validity: Do real responses pass the generated schemas?
+        #    (reported separately, not part of the overall score)
+        if samples:
+            contract_validity = self.contract_checker.contract_validity(
+                generated_spec, samples
+            )
+            if contract_validity is not None:
+                metrics['contract_validity'] = contract_validity
+        
         return metrics
     
     def _endpoint_coverage(
@@ -176,31 +190,36 @@ class EvalMetrics:
             return 0.0
     
     def _overall_score(self, metrics: Dict[str, float]) -> float:
-        """
-        Calculate weighted overall score
-        
-        Weights:
-        - Endpoint coverage: 30%
-        - Field accuracy: 30%
-        - Hallucination rate: 25% (inverted - lower is better)
-        - Schema validity: 15%
-        """
-        coverage = metrics.get('endpoint_coverage', 0.0)
-        accuracy = metrics.get('field_accuracy', 0.0)
-        hallucination = metrics.get('hallucination_rate', 1.0)
-        validity = metrics.get('schema_validity', 0.0)
-        
-        # Invert hallucination rate (lower is better)
-        hallucination_score = 1.0 - hallucination
-        
-        overall = (
-            coverage * 0.30 +
-            accuracy * 0.30 +
-            hallucination_score * 0.25 +
-            validity * 0.15
-        )
-        
-        return overall
+        """Calculate weighted overall score (see overall_score)"""
+        return overall_score(metrics)
+
+
+def overall_score(metrics: Dict[str, float]) -> float:
+    """
+    Calculate weighted overall score
+    
+    Weights:
+    - Endpoint coverage: 30%
+    - Field accuracy: 30%
+    - Hallucination rate: 25% (inverted - lower is better)
+    - Schema validity: 15%
+    """
+    coverage = metrics.get('endpoint_coverage', 0.0)
+    accuracy = metrics.get('field_accuracy', 0.0)
+    hallucination = metrics.get('hallucination_rate', 1.0)
+    validity = metrics.get('schema_validity', 0.0)
+    
+    # Invert hallucination rate (lower is better)
+    hallucination_score = 1.0 - hallucination
+    
+    overall = (
+        coverage * 0.30 +
+        accuracy * 0.30 +
+        hallucination_score * 0.25 +
+        validity * 0.15
+    )
+    
+    return overall
 
 
 def format_metrics_report(metrics: Dict[str, float]) -> str:
@@ -214,6 +233,8 @@ def format_metrics_report(metrics: Dict[str, float]) -> str:
     lines.append(f"Field Accuracy:       {metrics.get('field_accuracy', 0)*100:.1f}%")
     lines.append(f"Hallucination Rate:   {metrics.get('hallucination_rate', 0)*100:.1f}%")
     lines.append(f"Schema Validity:      {'✓ Valid' if metrics.get('schema_validity', 0) == 1.0 else '✗ Invalid'}")
+    if 'contract_validity' in metrics:
+        lines.append(f"Contract Validity:    {metrics['contract_validity']*100:.1f}%")
     lines.append("")
     lines.append(f"Overall Score:        {metrics.get('overall_score', 0)*100:.1f}%")
     lines.append("="*60)
@@ -0,0 +1,116 @@
+﻿"""
+Record Samples
+Fetches live responses for golden-set endpoints into SAMPLES_DIR
+
+Usage: python -m evals.record_samples [api_name]
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+import yaml
+
+from evals.config import GOLDEN_SET_DIR, SAMPLES_DIR
+from evals.contract_check import load_samples
+
+# Most recent distinct payloads kept per status, so repeat runs don't grow the file
+MAX_SAMPLES_PER_STATUS = 20
+
+
+def is_documented_status(status_code: int, responses: Dict[str, Any]) -> bool:
+    """Does the golden operation document this status (exactly, by range or default)?"""
+    code = str(status_code)
+    documented = {str(key).upper() for key in responses}
+    if code in documented or f"{code[0]}XX" in documented:
+        return True
+    return 'DEFAULT' in documented or 200 <= status_code < 300
+
+
+def record_golden_spec(spec_path: Path, timeout: float = 10.0) -> Optional[Path]:
+    """
+    Call every parameterless GET in a golden spec and record the responses
+
+    Only statuses the golden spec documents (or any 2xx) are kept - a 403,
+    429 or 5xx is an error, not a sample of the contract. Payloads are
+    deduplicated and capped at MAX_SAMPLES_PER_STATUS per status.
+
+    Args:
+        spec_path: Path to golden spec YAML
+        timeout: Per-request timeout in seconds
+
+    Returns:
+        Path of the samples file written (None if nothing was recorded)
+    """
+    with open(spec_path, 'r', encoding='utf-8') as f:
+        golden = yaml.safe_load(f)
+
+    expected_spec = golden['expected_spec']
+    base_url = expected_spec.get('servers', [{}])[0].get('url') or golden['source_url']
+    samples_path = SAMPLES_DIR / f"{golden['endpoint_id']}.json"
+    samples: Dict[str, Any] = load_samples(samples_path)
+    recorded = 0
+
+    for path, methods in expected_spec.get('paths', {}).items():
+        # Path parameters need real IDs; record those by hand
+        if 'get' not in methods or '{' in path:
+            continue
+
+        url = base_url.rstrip('/') + path
+        print(f"GET {url}")
+        try:
+            response = requests.get(url, timeout=timeout)
+        except requests.RequestException as e:
+            print(f"  Skipped: {e}")
+            continue
+        if not is_documented_status(response.status_code, methods['get'].get('responses', {})):
+            print(f"  Skipped: undocumented status {response.status_code}")
+            continue
+        try:
+            payload = response.json()
+        except ValueError:
+            print(f"  Skipped: non-JSON response ({response.status_code})")
+            continue
+
+        status_samples = (
+            samples.setdefault(path, {})
+            .setdefault('get', {})
+            .setdefault(str(response.status_code), [])
+        )
+        canonical = json.dumps(payload, sort_keys=True)
+        status_samples[:] = [
+            sample for sample in status_samples
+            if json.dumps(sample, sort_keys=True) != canonical
+        ]
+        status_samples.append(payload)
+        del status_samples[:-MAX_SAMPLES_PER_STATUS]
+        recorded += 1
+        print(f"  {response.status_code}: {len(status_samples)} sample(s) recorded")
+
+    if not recorded:
+        print("Nothing recorded")
+        return None
+
+    SAMPLES_DIR.mkdir(parents=True, exist_ok=True)
+    with open(samples_path, 'w', encoding='utf-8') as f:
+        json.dump(samples, f, indent=2)
+    print(f"Saved: {samples_path.name}")
+    return samples_path
+
+
+def main():
+    """Record samples for all golden specs (optionally one API)"""
+    api_filter = sys.argv[1] if len(sys.argv) > 1 else None
+    for api_dir in GOLDEN_SET_DIR.iterdir():
+        if not api_dir.is_dir():
+            continue
+        if api_filter and api_dir.name != api_filter:
+            continue
+        for spec_file in api_dir.glob('*.yaml'):
+            if spec_file.name != 'TEMPLATE.yaml':
+                record_golden_spec(spec_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+﻿"""
+Budget Scheduler
+Runs golden-set evaluations concurrently within a wall-clock and token budget
+"""
+import math
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Any, Dict, List
+
+from evals.budget import BudgetExceeded
+from evals.config import EVAL_APIS, TARGET_METRICS
+from evals.metrics import overall_score
+
+# Two-sided 95% Student-t critical values by degrees of freedom. Early
+# stopping happens at small n, where the normal 1.96 is far too narrow
+# (n=3 needs 4.30). Between entries, the next lower df is used, which
+# errs on the wide side.
+T_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571,
+    6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131,
+    16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+    25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980,
+}
+Z_95 = 1.96
+
+
+def t_critical(df: int) -> float:
+    """95% two-sided critical value for df degrees of freedom"""
+    if df > max(T_95):
+        return Z_95
+    return T_95[max(d for d in T_95 if d <= df)]
+
+
+def total_tokens(usage: Dict[str, int]) -> int:
+    """All tokens in a usage dict (uncached input, cache reads and output)"""
+    return (
+        usage.get('input_tokens', 0) +
+        usage.get('cache_read_input_tokens', 0) +
+        usage.get('output_tokens', 0)
+    )
+
+
+def overall_target() -> float:
+    """overall_score a spec would get if it exactly met every TARGET_METRICS value"""
+    return overall_score(TARGET_METRICS)
+
+
+def confidence_interval(scores: List[float]) -> tuple:
+    """95% Student-t CI for the mean; returns (mean, half_width)"""
+    mean = sum(scores) / len(scores)
+    if len(scores) < 2:
+        return mean, math.inf
+    critical = t_critical(len(scores) - 1)
+    half_width = critical * statistics.stdev(scores) / math.sqrt(len(scores))
+    return mean, half_width
+
+
+class BudgetScheduler:
+    """
+    Schedule eval cases between TestRunner and the generator
+
+    - Cases are ordered by API priority (EVAL_APIS), then cheapest first
+    - Up to max_workers cases run at once
+    - No case starts if its expected cost would overrun the budget
+    - Running cases get the run's deadline and stop at it (BudgetExceeded)
+    - An API stops early once the CI on overall_score is settled
+      against the target (or narrower than ci_tolerance)
+    """
+
+    def __init__(
+        self,
+        max_seconds: float,
+        max_tokens: int,
+        max_workers: int = 4,
+        min_samples: int = 3,
+        ci_tolerance: float = 0.02,
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            max_seconds: Wall-clock budget for the whole run
+            max_tokens: Generation token budget for the whole run
+            max_workers: Maximum concurrent generations
+            min_samples: Results needed per API before early stopping
+            ci_tolerance: Stop an API once the CI half-width is this narrow
+        """
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.max_workers = max_workers
+        self.min_samples = min_samples
+        self.ci_tolerance = ci_tolerance
+        self.target = overall_target()
+
+    def estimate_cost(self, runner, spec_path: Path) -> Dict[str, Any]:
+        """Expected token cost of a case (prompts for every chunk + output)"""
+        golden = runner.load_golden_spec(spec_path)
+        return {
+            'spec_path': spec_path,
+            'api': golden['api'],
+            'tokens': total_tokens(runner.estimate_usage(spec_path)),
+        }
+
+    def order_cases(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Priority order from EVAL_APIS (unknown APIs last), then cheapest first"""
+        def priority(case):
+            api = case['api']
+            rank = EVAL_APIS.index(api) if api in EVAL_APIS else len(EVAL_APIS)
+            return (rank, case['tokens'], case['spec_path'].name)
+        return sorted(cases, key=priority)
+
+    def is_settled(self, scores: List[float]) -> bool:
+        """Is the overall_score CI tight enough to stop running this API?"""
+        if len(scores) < self.min_samples:
+            return False
+        mean, half_width = confidence_interval(scores)
+        if half_width <= self.ci_tolerance:
+            return True
+        # CI entirely above or below the target: more cases won't change the verdict
+        return mean - half_width >= self.target or mean + half_width < self.target
+
+    def run(self, runner, golden_specs: List[Path]) -> Dict[str, Any]:
+        """
+        Run golden specs through the runner within budget
+
+        Each case's report is buffered and printed when it completes, so
+        concurrent cases don't interleave. A case is only reported as
+        skipped once it has actually stopped.
+
+        Args:
+            runner: TestRunner used to run each case
+            golden_specs: Golden spec paths to consider
+
+        Returns:
+            Dictionary with 'results', 'skipped', 'usage' and 'confidence'
+        """
+        start = time.monotonic()
+        deadline = start + self.max_seconds
+        pending = self.order_cases(
+            [self.estimate_cost(runner, path) for path in golden_specs]
+        )
+
+        results = []
+        skipped = []
+        scores: Dict[str, List[float]] = {}
+        settled = set()
+        durations: List[float] = []
+        tokens_used = 0
+        tokens_reserved = 0
+        in_flight = {}
+
+        def skip(case, reason, error=None):
+            item = {
+                'spec': case['spec_path'].name,
+                'api': case['api'],
+                'reason': reason,
+            }
+            if error:
+                item['error'] = error
+            skipped.append(item)
+
+        def expected_seconds():
+            return statistics.mean(durations) if durations else 0.0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or in_flight:
+                # Submit as many cases as the budget and worker pool allow
+                while pending and len(in_flight) < self.max_workers:
+                    case = pending.pop(0)
+                    if case['api'] in settled:
+                        skip(case, 'confidence_reached')
+                    elif tokens_used + tokens_reserved + case['tokens'] > self.max_tokens:
+                        skip(case, 'token_budget')
+                    elif time.monotonic() + expected_seconds() > deadline:
+                        skip(case, 'time_budget')
+                    else:
+                        future = executor.submit(
+                            self._run_case, runner, case['spec_path'], deadline
+                        )
+                        in_flight[future] = case
+                        tokens_reserved += case['tokens']
+
+                if not in_flight:
+                    continue
+
+                # Wake at the deadline to skip pending cases; after that, just
+                # wait for running cases to stop (they hit the same deadline)
+                timeout = max(deadline - time.monotonic(), 0) if pending else None
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    case = in_flight.pop(future)
+                    tokens_reserved -= case['tokens']
+                    outcome = future.result()
+                    print("\n".join(outcome['log']))
+                    durations.append(outcome['seconds'])
+
+                    if outcome['result'] is None:
+                        # Usage of a failed case is unknown; charge its estimate
+                        tokens_used += case['tokens']
+                        skip(case, outcome['reason'], outcome['error'])
+                        continue
+
+                    result = outcome['result']
+                    tokens_used += total_tokens(result.get('usage', {}))
+                    results.append(result)
+
+                    api_scores = scores.setdefault(case['api'], [])
+                    api_scores.append(result['metrics']['overall_score'])
+                    if self.is_settled(api_scores):
+                        settled.add(case['api'])
+
+        return {
+            'results': results,
+            'skipped': skipped,
+            'usage': {
+                'seconds': time.monotonic() - start,
+                'tokens': tokens_used,
+                'max_seconds': self.max_seconds,
+                'max_tokens': self.max_tokens,
+            },
+            'confidence': {
+                api: dict(zip(('mean', 'half_width'), confidence_interval(api_scores)))
+                for api, api_scores in scores.items()
+            },
+        }
+
+    @staticmethod
+    def _run_case(runner, spec_path: Path, deadline: float) -> Dict[str, Any]:
+        """Run one case in a worker thread, capturing its report and any error"""
+        log: List[str] = []
+        outcome = {'result': None, 'reason': None, 'error': None, 'log': log}
+        start = time.monotonic()
+        try:
+            outcome['result'] = runner.run_single_test(
+                spec_path, deadline=deadline, log=log.append
+            )
+        except BudgetExceeded as e:
+            outcome['reason'] = 'time_budget'
+            outcome['error'] = str(e)
+            log.append(f"Stopped: {e}")
+        except Exception as e:
+            outcome['reason'] = 'error'
+            outcome['error'] = f"{type(e).__name__}: {e}"
+            log.append(f"Failed: {outcome['error']}")
+        outcome['seconds'] = time.monotonic() - start
+        return outcome
+
+
+def format_schedule_report(schedule: Dict[str, Any]) -> str:
+    """Format budget usage and skipped cases as a readable report"""
+    usage = schedule['usage']
+    lines = []
+    lines.append("="*60)
+    lines.append("SCHEDULE")
+    lines.append("="*60)
+    lines.append(f"Time used:    {usage['seconds']:.1f}s / {usage['max_seconds']:.1f}s")
+    lines.append(f"Tokens used:  {usage['tokens']} / {usage['max_tokens']}")
+    lines.append(f"Cases run:    {len(schedule['results'])}")
+    lines.append(f"Skipped:      {len(schedule['skipped'])}")
+    for item in schedule['skipped']:
+        line = f"  {item['api']:<16} {item['spec']:<30} {item['reason']}"
+        if item.get('error'):
+            line += f" ({item['error']})"
+        lines.append(line)
+    lines.append("="*60)
+    return "\n".join(lines)
@@ -3,7 +3,11 @@ Stub Generator
 A placeholder generator for testing the eval harness
 Returns intentionally imperfect specs to verify metrics work
 """
-from typing import Dict, Any
+import json
+from typing import Dict, Any, Optional
+
+from evals.budget import check_deadline
+from src.doc_ingestion import PromptBuilder, estimate_tokens
 
 
 class StubGenerator:
@@ -17,12 +21,36 @@ class StubGenerator:
     - Some incorrect fields
     """
     
-    def generate_spec(self, api_name: str) -> Dict[str, Any]:
-        """Generate a stub OpenAPI spec for testing"""
+    def generate_spec(
+        self,
+        api_name: str,
+        docs: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a stub OpenAPI spec for testing
+        
+        Args:
+            api_name: API to generate for
+            docs: Ingested documentation (see src.doc_ingestion)
+            deadline: time.monotonic() deadline; raises BudgetExceeded past it
+            usage: If given, filled with token usage. The stub makes no model
+                   calls, so it reports what sending every chunk's prompt
+                   would cost - this keeps the budget plumbing exercised.
+        """
+        check_deadline(deadline)
+        
         if api_name == 'jsonplaceholder':
-            return self._jsonplaceholder_stub()
+            spec = self._jsonplaceholder_stub()
         else:
-            return self._generic_stub(api_name)
+            spec = self._generic_stub(api_name)
+        
+        if usage is not None:
+            usage.update(PromptBuilder().estimate_usage(
+                api_name, docs, estimate_tokens(json.dumps(spec))
+            ))
+        return spec
     
     def _jsonplaceholder_stub(self) -> Dict[str, Any]:
         """
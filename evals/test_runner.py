@@ -2,15 +2,23 @@
 Test Runner
 Loads golden specs, runs generator, calculates metrics
 """
+import argparse
 import yaml
 import json
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 
-from evals.config import GOLDEN_SET_DIR, GENERATED_DIR, EVAL_RESULTS_DIR
+from evals.config import (
+    GOLDEN_SET_DIR, GENERATED_DIR, EVAL_RESULTS_DIR, SAMPLES_DIR, DOC_CACHE_DIR,
+    NIGHTLY_MAX_SECONDS, NIGHTLY_MAX_TOKENS, MAX_CONCURRENT_GENERATIONS
+)
+from evals.contract_check import load_samples
 from evals.metrics import EvalMetrics, format_metrics_report
+from evals.budget import check_deadline
+from evals.scheduler import BudgetScheduler, format_schedule_report
 from evals.stub_generator import StubGenerator
+from src.doc_ingestion import DocIngestor, PromptBuilder, estimate_tokens
 
 
 class TestRunner:
@@ -26,6 +34,11 @@ class TestRunner:
         """
         self.use_stub = use_stub
         self.metrics_calculator = EvalMetrics()
+        self.ingestor = DocIngestor(DOC_CACHE_DIR)
+        self.prompt_builder = PromptBuilder()
+        # Ingestions done ahead of a run (estimate_usage), handed to the
+        # case that runs next so it reports the original (cold) timing
+        self._prefetched_ingests = {}
         
         if use_stub:
             self.generator = StubGenerator()
@@ -38,18 +51,79 @@ class TestRunner:
             golden = yaml.safe_load(f)
         return golden
     
-    def run_single_test(self, golden_spec_path: Path) -> Dict[str, Any]:
+    def ingest_docs(self, api_name: str, documentation: str, log=print):
+        """
+        Run documentation through the ingestion pipeline
+        
+        Args:
+            api_name: API the docs belong to
+            documentation: Raw documentation text
+            log: Where progress lines go (print, or a buffer's append)
+            
+        Returns:
+            (ingested docs, stats) - docs is None if there is no documentation
+        """
+        if not documentation:
+            return None, {}
+        
+        prefetched = self._prefetched_ingests.pop((api_name, documentation), None)
+        docs, stats = prefetched or self._ingest(api_name, documentation)
+        
+        log(f"Ingested docs: {stats['chunk_count']} chunk(s), "
+            f"{stats['tokens_saved']} tokens saved, "
+            f"{stats['ingest_seconds']*1000:.1f}ms"
+            f"{' (cached)' if stats['cache_hit'] else ''}")
+        return docs, stats
+    
+    def _ingest(self, api_name: str, documentation: str):
+        """Ingest docs and collect their stats (see ingest_docs)"""
+        docs = self.ingestor.ingest(api_name, documentation)
+        stats = dict(docs['stats'])
+        stats.update(self.prompt_builder.cache_stats(api_name, docs))
+        stats['tokens_saved'] = (
+            stats['dedupe_tokens_saved'] + stats['prompt_cache_tokens_saved']
+        )
+        return docs, stats
+    
+    def estimate_usage(self, golden_spec_path: Path) -> Dict[str, int]:
+        """
+        Expected generation token usage for a golden spec, before running it
+        
+        Input: the shared prefix for every prompt plus each chunk.
+        Output: roughly the size of the expected spec.
+        """
+        golden = self.load_golden_spec(golden_spec_path)
+        api_name = golden['api']
+        documentation = golden.get('documentation_snapshot')
+        docs = None
+        if documentation:
+            key = (api_name, documentation)
+            if key not in self._prefetched_ingests:
+                self._prefetched_ingests[key] = self._ingest(api_name, documentation)
+            docs = self._prefetched_ingests[key][0]
+        output_tokens = estimate_tokens(json.dumps(golden['expected_spec']))
+        return self.prompt_builder.estimate_usage(api_name, docs, output_tokens)
+    
+    def run_single_test(
+        self,
+        golden_spec_path: Path,
+        deadline: Optional[float] = None,
+        log=print
+    ) -> Dict[str, Any]:
         """
         Run evaluation for a single golden spec
         
         Args:
             golden_spec_path: Path to golden spec YAML
+            deadline: Optional time.monotonic() deadline; generation raises
+                     BudgetExceeded past it and nothing is written
+            log: Where progress lines go (print, or a buffer's append)
             
         Returns:
             Dictionary with test results and metrics
         """
-        print(f"\nTesting: {golden_spec_path.name}")
-        print("-" * 60)
+        log(f"\nTesting: {golden_spec_path.name}")
+        log("-" * 60)
         
         # Load golden spec
         golden = self.load_golden_spec(golden_spec_path)
@@ -57,21 +131,34 @@ class TestRunner:
         api_name = golden['api']
         endpoint_id = golden['endpoint_id']
         
+        # Ingest documentation (chunk, dedupe, cache)
+        docs, ingestion_stats = self.ingest_docs(
+            api_name, golden.get('documentation_snapshot', ''), log=log
+        )
+        
         # Generate spec (using stub for now)
-        print(f"Generating spec for {api_name}...")
-        generated_spec = self.generator.generate_spec(api_name)
+        check_deadline(deadline)
+        log(f"Generating spec for {api_name}...")
+        usage = {}
+        generated_spec = self.generator.generate_spec(
+            api_name, docs=docs, deadline=deadline, usage=usage
+        )
         
         # Save generated spec
         generated_path = GENERATED_DIR / f"{endpoint_id}_generated.json"
         with open(generated_path, 'w', encoding='utf-8') as f:
             json.dump(generated_spec, f, indent=2)
-        print(f"Saved: {generated_path.name}")
+        log(f"Saved: {generated_path.name}")
+        
+        # Load recorded sample responses (optional)
+        samples = load_samples(SAMPLES_DIR / f"{endpoint_id}.json")
         
         # Calculate metrics
-        print("Calculating metrics...")
+        log("Calculating metrics...")
         metrics = self.metrics_calculator.calculate_all_metrics(
             generated_spec,
-            expected_spec
+            expected_spec,
+            samples=samples
         )
         
         # Build results
@@ -80,6 +167,8 @@ class TestRunner:
             'api': api_name,
             'timestamp': datetime.now().isoformat(),
             'metrics': metrics,
+            'ingestion': ingestion_stats,
+            'usage': usage,
             'generator': 'stub' if self.use_stub else 'real',
         }
         
@@ -87,19 +176,39 @@ class TestRunner:
         results_path = EVAL_RESULTS_DIR / f"{endpoint_id}_results.json"
         with open(results_path, 'w', encoding='utf-8') as f:
             json.dump(results, f, indent=2)
-        print(f"Saved: {results_path.name}")
+        log(f"Saved: {results_path.name}")
         
         # Print metrics
-        print(format_metrics_report(metrics))
+        log(format_metrics_report(metrics))
         
         return results
     
-    def run_all_tests(self, api_filter: str = None) -> List[Dict[str, Any]]:
+    def find_golden_specs(self, api_filter: str = None) -> List[Path]:
+        """Find all golden spec files, optionally for a single API"""
+        golden_specs = []
+        for api_dir in GOLDEN_SET_DIR.iterdir():
+            if not api_dir.is_dir():
+                continue
+            if api_filter and api_dir.name != api_filter:
+                continue
+            
+            for spec_file in api_dir.glob('*.yaml'):
+                if spec_file.name != 'TEMPLATE.yaml':
+                    golden_specs.append(spec_file)
+        return golden_specs
+    
+    def run_all_tests(
+        self,
+        api_filter: str = None,
+        scheduler: Optional[BudgetScheduler] = None
+    ) -> List[Dict[str, Any]]:
         """
         Run evaluations for all golden specs
         
         Args:
             api_filter: Optional API name to filter
+            scheduler: Optional budget scheduler; if given, cases run
+                      concurrently and may be skipped to stay in budget
             
         Returns:
             List of all test results
@@ -109,24 +218,20 @@ class TestRunner:
         print("="*60)
         
         # Find all golden specs
-        golden_specs = []
-        for api_dir in GOLDEN_SET_DIR.iterdir():
-            if not api_dir.is_dir():
-                continue
-            if api_filter and api_dir.name != api_filter:
-                continue
-            
-            for spec_file in api_dir.glob('*.yaml'):
-                if spec_file.name != 'TEMPLATE.yaml':
-                    golden_specs.append(spec_file)
+        golden_specs = self.find_golden_specs(api_filter)
         
         print(f"\nFound {len(golden_specs)} golden spec(s)")
         
         # Run tests
-        all_results = []
-        for spec_path in golden_specs:
-            results = self.run_single_test(spec_path)
-            all_results.append(results)
+        if scheduler:
+            schedule = scheduler.run(self, golden_specs)
+            all_results = schedule['results']
+            print(format_schedule_report(schedule))
+        else:
+            all_results = []
+            for spec_path in golden_specs:
+                results = self.run_single_test(spec_path)
+                all_results.append(results)
         
         # Summary
         self._print_summary(all_results)
@@ -171,13 +276,54 @@ class TestRunner:
         print(f"Avg Field Accuracy:     {avg_accuracy*100:.1f}%")
         print(f"Avg Hallucination Rate: {avg_hallucination*100:.1f}%")
         print(f"Avg Overall Score:      {avg_overall*100:.1f}%")
+        
+        contract_results = [
+            r['metrics']['contract_validity'] for r in all_results
+            if 'contract_validity' in r['metrics']
+        ]
+        if contract_results:
+            avg_contract = sum(contract_results) / len(contract_results)
+            print(f"Avg Contract Validity:  {avg_contract*100:.1f}% "
+                  f"({len(contract_results)} with samples)")
+        
+        # Ingestion cost per API
+        per_api = {}
+        for r in all_results:
+            stats = r.get('ingestion') or {}
+            if not stats:
+                continue
+            api = per_api.setdefault(r['api'], {'tokens_saved': 0, 'seconds': 0.0})
+            api['tokens_saved'] += stats['tokens_saved']
+            api['seconds'] += stats['ingest_seconds']
+        if per_api:
+            print("\nDoc ingestion:")
+            for api_name, api in per_api.items():
+                print(f"  {api_name:<20} {api['tokens_saved']:>8} tokens saved  "
+                      f"{api['seconds']*1000:>8.1f}ms")
         print("="*60)
 
 
 def main():
     """Run from command line"""
+    parser = argparse.ArgumentParser(description="Run spec generation evals")
+    parser.add_argument('--api', help="Only run this API")
+    parser.add_argument('--budget', action='store_true',
+                        help="Run within the nightly time/token budget")
+    parser.add_argument('--max-seconds', type=float, default=NIGHTLY_MAX_SECONDS)
+    parser.add_argument('--max-tokens', type=int, default=NIGHTLY_MAX_TOKENS)
+    parser.add_argument('--workers', type=int, default=MAX_CONCURRENT_GENERATIONS)
+    args = parser.parse_args()
+    
+    scheduler = None
+    if args.budget:
+        scheduler = BudgetScheduler(
+            max_seconds=args.max_seconds,
+            max_tokens=args.max_tokens,
+            max_workers=args.workers,
+        )
+    
     runner = TestRunner(use_stub=True)
-    runner.run_all_tests()
+    runner.run_all_tests(api_filter=args.api, scheduler=scheduler)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,390 @@
+﻿"""
+Documentation Ingestion
+Streams API docs into endpoint-sized chunks ahead of spec generation
+
+Pipeline:
+1. Stream the docs line by line and split on endpoint sections
+2. Move repeated boilerplate paragraphs (by hash) into a shared block,
+   leaving a short reference in each chunk
+3. Cache the chunked result on disk, keyed by source hash
+4. Build prompts with a stable shared prefix for provider prompt caching
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+# Bump when chunking/dedupe logic changes so stale cache entries are ignored
+INGESTION_VERSION = 3
+
+# Rough token estimate (no tokenizer dependency); good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Repeated paragraphs shorter than this (e.g. "Parameters") stay in place
+MIN_BOILERPLATE_CHARS = 40
+
+# A new section starts at a markdown heading, or at an HTTP endpoint line
+# unless the current heading's section has no endpoint yet
+HEADING_LINE = re.compile(r'^\s*#{1,6}\s+\S')
+ENDPOINT_START = re.compile(r'^\s*(?:GET|POST|PUT|PATCH|DELETE|HEAD|OPTIONS)\s+/')
+ENDPOINT_LINE = re.compile(
+    r'\b(GET|POST|PUT|PATCH|DELETE|HEAD|OPTIONS)\s+(/\S*)'
+)
+
+# Placeholder left in a chunk where a shared paragraph was removed
+SHARED_REF = '[shared doc #{}]'
+
+DEFAULT_INSTRUCTIONS = (
+    "You are generating an OpenAPI 3.0 specification from API documentation. "
+    "Only describe endpoints, parameters and fields that appear in the "
+    "documentation. Do not invent anything."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count for a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _normalize(paragraph: str) -> str:
+    """Whitespace/case-insensitive form used for dedupe hashing"""
+    return ' '.join(paragraph.split()).lower()
+
+
+def iter_lines(source: Union[str, Path, Iterable[str]]) -> Iterator[str]:
+    """Yield lines from a file path, a string, or any iterable of lines"""
+    if isinstance(source, Path):
+        with open(source, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield line.rstrip('\n')
+    elif isinstance(source, str):
+        yield from source.splitlines()
+    else:
+        for line in source:
+            yield line.rstrip('\n')
+
+
+def iter_sections(
+    lines: Iterable[str],
+    max_chars: int = 8000
+) -> Iterator[Dict[str, Any]]:
+    """
+    Split a stream of doc lines into endpoint sections
+
+    A heading followed by its endpoint line (``## List repos`` then
+    ``GET /user/repos``) is one section titled by the heading. Sections
+    with nothing but a heading are dropped. Sections longer than max_chars
+    are split further, and single lines longer than max_chars (e.g. minified
+    JSON examples) are cut into pieces, so no chunk outgrows a prompt.
+
+    Yields:
+        {'title': str, 'endpoint': str or None, 'text': str}
+    """
+    title = 'Overview'
+    has_heading = False
+    has_endpoint = False
+    buffer: List[str] = []
+    size = 0
+
+    def flush():
+        body = [line for line in buffer if line.strip()]
+        if not body or (len(body) == 1 and HEADING_LINE.match(body[0])):
+            return None
+        text = '\n'.join(buffer).strip()
+        match = ENDPOINT_LINE.search(title) or ENDPOINT_LINE.search(text)
+        endpoint = f"{match.group(1)} {match.group(2)}" if match else None
+        return {'title': title, 'endpoint': endpoint, 'text': text}
+
+    def pieces(lines):
+        # (piece, is_first_piece_of_line)
+        for line in lines:
+            if len(line) <= max_chars:
+                yield line, True
+                continue
+            for start in range(0, len(line), max_chars):
+                yield line[start:start + max_chars], start == 0
+
+    for line, is_line_start in pieces(lines):
+        is_heading = is_line_start and bool(HEADING_LINE.match(line))
+        is_endpoint = is_line_start and bool(ENDPOINT_START.match(line))
+        starts_section = is_heading or (
+            is_endpoint and (has_endpoint or not has_heading)
+        )
+
+        if starts_section or size + len(line) > max_chars:
+            section = flush()
+            if section:
+                yield section
+            if starts_section:
+                title = line.strip().lstrip('#').strip()
+                has_heading = is_heading
+                has_endpoint = False
+            buffer, size = [], 0
+        if is_endpoint:
+            has_endpoint = True
+        buffer.append(line)
+        size += len(line) + 1
+
+    section = flush()
+    if section:
+        yield section
+
+
+class DocIngestor:
+    """Chunk, dedupe and cache API documentation"""
+
+    def __init__(self, cache_dir: Path, max_chunk_chars: int = 8000):
+        """
+        Initialize ingestor
+
+        Args:
+            cache_dir: Where parsed/chunked docs are cached
+            max_chunk_chars: Upper bound on a single chunk's size
+        """
+        self.cache_dir = cache_dir
+        self.max_chunk_chars = max_chunk_chars
+
+    def _cache_path(self, api_name: str, source_hash: str) -> Path:
+        return self.cache_dir / api_name / f"{source_hash[:16]}.json"
+
+    def _source_hash(self, source: Union[str, Path]) -> str:
+        """Hash the raw docs (streamed for files) plus chunking settings"""
+        hasher = hashlib.sha256()
+        hasher.update(f"v{INGESTION_VERSION}:{self.max_chunk_chars}:".encode('utf-8'))
+        if isinstance(source, Path):
+            with open(source, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 16), b''):
+                    hasher.update(block)
+        else:
+            hasher.update(source.encode('utf-8'))
+        return hasher.hexdigest()
+
+    def ingest(self, api_name: str, source: Union[str, Path]) -> Dict[str, Any]:
+        """
+        Ingest documentation for an API, using the disk cache when possible
+
+        Args:
+            api_name: API identifier (used for the cache directory)
+            source: Raw documentation text, or a path to a docs file
+
+        Returns:
+            Dictionary with 'chunks', 'boilerplate' and 'stats'
+        """
+        start = time.perf_counter()
+        source_hash = self._source_hash(source)
+        cache_path = self._cache_path(api_name, source_hash)
+
+        ingested = self._read_cache(cache_path)
+        if ingested is not None:
+            ingested['stats']['cache_hit'] = True
+        else:
+            ingested = self._chunk_and_dedupe(source)
+            ingested['source_hash'] = source_hash
+            self._write_cache(cache_path, ingested)
+            ingested['stats']['cache_hit'] = False
+
+        ingested['stats']['ingest_seconds'] = time.perf_counter() - start
+        return ingested
+
+    def _read_cache(self, cache_path: Path) -> Optional[Dict[str, Any]]:
+        """Load a cache entry; a missing or corrupt file is a cache miss"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, cache_path: Path, ingested: Dict[str, Any]):
+        """Write via a temp file + os.replace so readers never see a partial file"""
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=cache_path.parent, prefix=cache_path.stem, suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(ingested, f, indent=2)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _chunk_and_dedupe(self, source: Union[str, Path]) -> Dict[str, Any]:
+        """
+        Stream the docs into sections and dedupe repeated paragraphs
+
+        A substantial paragraph seen more than once is boilerplate: it is kept
+        a single time in the shared prompt prefix, and each chunk keeps a
+        short reference to it so per-endpoint associations (e.g. which
+        endpoints take a shared parameter) survive.
+        """
+        counts: Dict[str, int] = {}
+        first_seen: Dict[str, str] = {}
+        sections = []
+        raw_tokens = 0
+
+        for section in iter_sections(iter_lines(source), self.max_chunk_chars):
+            paragraphs = []
+            for paragraph in re.split(r'\n\s*\n', section['text']):
+                paragraph = paragraph.strip()
+                if not paragraph:
+                    continue
+                raw_tokens += estimate_tokens(paragraph)
+                key = _hash_text(_normalize(paragraph))
+                counts[key] = counts.get(key, 0) + 1
+                first_seen.setdefault(key, paragraph)
+                paragraphs.append((key, paragraph))
+            sections.append((section, paragraphs))
+
+        boilerplate_keys = [
+            key for key, count in counts.items()
+            if count > 1 and len(first_seen[key]) >= MIN_BOILERPLATE_CHARS
+        ]
+        boilerplate = [first_seen[key] for key in boilerplate_keys]
+        refs = {key: SHARED_REF.format(i) for i, key in enumerate(boilerplate_keys, 1)}
+
+        chunks = []
+        for section, paragraphs in sections:
+            text = '\n\n'.join(refs.get(key, p) for key, p in paragraphs)
+            if not text:
+                continue
+            chunks.append({
+                'title': section['title'],
+                'endpoint': section['endpoint'],
+                'text': text,
+                'hash': _hash_text(text),
+                'tokens': estimate_tokens(text),
+            })
+
+        ingested_tokens = (
+            sum(chunk['tokens'] for chunk in chunks) +
+            sum(estimate_tokens(p) for p in boilerplate)
+        )
+        return {
+            'chunks': chunks,
+            'boilerplate': boilerplate,
+            'stats': {
+                'raw_tokens': raw_tokens,
+                'ingested_tokens': ingested_tokens,
+                'dedupe_tokens_saved': max(raw_tokens - ingested_tokens, 0),
+                'chunk_count': len(chunks),
+            },
+        }
+
+
+class PromptBuilder:
+    """
+    Assemble generation prompts with a stable shared prefix
+
+    The prefix (instructions + shared boilerplate) is byte-identical for
+    every chunk of an API, so provider-side prompt caching can reuse it.
+    Only the per-endpoint chunk varies, and it always comes last.
+    """
+
+    def __init__(self, instructions: str = DEFAULT_INSTRUCTIONS):
+        self.instructions = instructions
+
+    def prefix(self, api_name: str, ingested: Dict[str, Any]) -> str:
+        """Stable shared prefix for every prompt of this API"""
+        parts = [self.instructions, f"API: {api_name}"]
+        if ingested['boilerplate']:
+            parts.append(
+                "Shared documentation (chunks refer to these as "
+                f"{SHARED_REF.format('N')}):"
+            )
+            parts.extend(
+                f"{SHARED_REF.format(i)}\n{paragraph}"
+                for i, paragraph in enumerate(ingested['boilerplate'], 1)
+            )
+        return '\n\n'.join(parts)
+
+    def build(
+        self,
+        api_name: str,
+        ingested: Dict[str, Any],
+        chunk: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Build a single prompt for one chunk
+
+        Returns:
+            {'system': [...], 'messages': [...]} in Anthropic Messages format,
+            with the shared prefix marked cacheable
+        """
+        return {
+            'system': [{
+                'type': 'text',
+                'text': self.prefix(api_name, ingested),
+                'cache_control': {'type': 'ephemeral'},
+            }],
+            'messages': [{
+                'role': 'user',
+                'content': chunk['text'],
+            }],
+        }
+
+    def build_all(
+        self,
+        api_name: str,
+        ingested: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Build prompts for every chunk, in document order"""
+        return [self.build(api_name, ingested, chunk) for chunk in ingested['chunks']]
+
+    def cache_stats(
+        self,
+        api_name: str,
+        ingested: Dict[str, Any],
+        min_cacheable_tokens: Optional[int] = 1024
+    ) -> Dict[str, int]:
+        """
+        Estimate tokens served from the provider prompt cache
+
+        Every prompt after the first re-sends the same prefix, so those
+        prefix tokens are cache reads (if the prefix is long enough to cache).
+        """
+        prefix_tokens = estimate_tokens(self.prefix(api_name, ingested))
+        prompt_count = len(ingested['chunks'])
+        cacheable = min_cacheable_tokens is None or prefix_tokens >= min_cacheable_tokens
+        cached = prefix_tokens * max(prompt_count - 1, 0) if cacheable else 0
+        return {
+            'prefix_tokens': prefix_tokens,
+            'prompt_count': prompt_count,
+            'prompt_cache_tokens_saved': cached,
+        }
+
+    def estimate_usage(
+        self,
+        api_name: str,
+        ingested: Optional[Dict[str, Any]],
+        output_tokens: int = 0,
+        min_cacheable_tokens: Optional[int] = 1024
+    ) -> Dict[str, int]:
+        """
+        Estimate token usage for sending every chunk's prompt
+
+        Uses the provider's usage field names: input_tokens excludes prefix
+        tokens served from the prompt cache (cache_read_input_tokens).
+        """
+        if not ingested or not ingested['chunks']:
+            return {'input_tokens': 0, 'cache_read_input_tokens': 0,
+                    'output_tokens': output_tokens}
+
+        stats = self.cache_stats(api_name, ingested, min_cacheable_tokens)
+        sent = (
+            stats['prefix_tokens'] * stats['prompt_count'] +
+            sum(chunk['tokens'] for chunk in ingested['chunks'])
+        )
+        cached = stats['prompt_cache_tokens_saved']
+        return {
+            'input_tokens': sent - cached,
+            'cache_read_input_tokens': cached,
+            'output_tokens': output_tokens,
+        }